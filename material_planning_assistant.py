@@ -1,10 +1,13 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
+import pyarrow as pa
+import pyarrow.parquet as pq
 from datetime import datetime, timedelta
 import os
+import zipfile
+import tempfile
+import hashlib
 import glob
 from io import BytesIO
 
@@ -46,16 +49,157 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
+# Version of the data stored in Parquet sidecars - bump it whenever load_data
+# changes the columns or dtypes it produces, so older sidecars are rebuilt
+SIDECAR_VERSION = 2
+
+def get_parquet_cache_path(file_path):
+    """
+    Get the Parquet sidecar path for a Material Study file on disk.
+
+    The sidecar is keyed by the file's modification time and size and by
+    SIDECAR_VERSION, so replacing the Excel file or upgrading the loader
+    automatically invalidates it. Uploaded files have no path on disk and are
+    never cached.
+    """
+    if not isinstance(file_path, str) or not os.path.isfile(file_path):
+        return None
+    stat = os.stat(file_path)
+    return f"{file_path}.{stat.st_mtime_ns}.{stat.st_size}.v{SIDECAR_VERSION}.parquet"
+
+def write_parquet_cache(df, file_path, cache_path):
+    """
+    Write the Parquet sidecar of a Material Study file.
+
+    The data is written to a temporary file that is then renamed into place,
+    so other sessions never see a partially written sidecar.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(cache_path)),
+                                    prefix=f"{os.path.basename(cache_path)}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        df.to_parquet(tmp_path, engine='pyarrow', compression='zstd')
+        # mkstemp creates the file owner-only - give the sidecar the usual
+        # permissions so other accounts sharing the folder can read it
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_path, 0o666 & ~umask)
+        os.replace(tmp_path, cache_path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+    # Drop sidecars left over from previous versions of the file or the loader,
+    # only once the new one is in place
+    for old_cache in glob.glob(f"{glob.escape(file_path)}.*.parquet"):
+        if old_cache != cache_path:
+            os.remove(old_cache)
+
+def get_data_token(source):
+    """
+    Cheap identity of the loaded Material Study - the file's path, modification
+    time and size, or the upload's file id - used to key caches without hashing data.
+    Uploads without a file id fall back to a digest of their contents.
+    """
+    if isinstance(source, str):
+        stat = os.stat(source)
+        return (source, stat.st_mtime_ns, stat.st_size)
+    file_id = getattr(source, 'file_id', None)
+    if file_id:
+        return file_id
+    return hashlib.sha256(source.getvalue()).hexdigest()
+
+# Study sheet columns used by the app - other columns are not loaded
+STUDY_COLS = [
+    'SEC order', 'SEC Number', 'product', 'item', 'description', 'req_qty', 'allocated_qty', 'balance',
+    'supply_type', 'source', 'locater', 'availability_date', 'delay', 'supplier', 'SEC delivery',
+    'ROH delivery', 'Asn Expected Date', 'Asn Creation Date'
+]
+
+# Low-cardinality columns used for filtering and grouping
+CATEGORY_COLS = ['supply_type', 'SEC order', 'SEC Number', 'product', 'supplier', 'locater', 'source']
+
+# Quantity columns that can be stored as int32 / float32
+QUANTITY_COLS = ['req_qty', 'allocated_qty', 'balance']
+
+def downcast_exact(series):
+    """
+    Store a numeric column as int32 or float32 when every value survives the
+    conversion exactly; otherwise return it unchanged.
+    """
+    values = series.to_numpy()
+    info = np.iinfo(np.int32)
+    fits_int32 = values.size == 0 or (values.min() >= info.min and values.max() <= info.max)
+    if series.dtype.kind == 'i':
+        return series.astype(np.int32) if fits_int32 else series
+    if series.dtype != np.float64:
+        return series
+    if np.isfinite(values).all() and (values == np.round(values)).all() and fits_int32:
+        return series.astype(np.int32)
+    downcast = series.astype(np.float32)
+    if np.array_equal(downcast.to_numpy(np.float64), values, equal_nan=True):
+        return downcast
+    return series
+
+def optimize_dtypes(df):
+    """
+    Convert columns to compact dtypes.
+
+    Low-cardinality columns become categoricals so filters and groupbys work on
+    integer codes; the remaining text columns are stored as Arrow strings.
+    Quantities are downcast to int32 (whole numbers, no blanks) or float32 only
+    when every value survives the conversion exactly, so displayed and exported
+    numbers never change.
+    """
+    for col in df.columns:
+        if col in CATEGORY_COLS:
+            df[col] = df[col].astype('category')
+        elif df[col].dtype == object or (
+                isinstance(df[col].dtype, pd.StringDtype) and df[col].dtype.storage != 'pyarrow'):
+            # Parquet sidecars read back text as Python-backed strings
+            df[col] = df[col].astype('string[pyarrow]')
+        elif col in QUANTITY_COLS and df[col].dtype == np.float64:
+            df[col] = downcast_exact(df[col])
+    return df
+
 @st.cache_data
 def load_data(file_path):
     """Load the Material Study Excel file"""
     try:
-        df = pd.read_excel(file_path, sheet_name="Study")
-        # Convert date columns
-        date_cols = ['availability_date', 'ROH delivery', 'SEC delivery', 'Asn Expected Date', 'Asn Creation Date']
-        for col in date_cols:
-            if col in df.columns:
-                df[col] = pd.to_datetime(df[col], errors='coerce')
+        cache_path = get_parquet_cache_path(file_path)
+        df = None
+        if cache_path and os.path.exists(cache_path):
+            try:
+                df = optimize_dtypes(pd.read_parquet(cache_path, engine='pyarrow'))
+            except Exception:
+                # Unreadable sidecar - remove it and rebuild it from the Excel file
+                try:
+                    os.remove(cache_path)
+                except OSError:
+                    pass
+
+        if df is None:
+            # calamine is a Rust xlsx reader, several times faster than openpyxl
+            df = pd.read_excel(file_path, sheet_name="Study", usecols=lambda col: col in STUDY_COLS,
+                               engine='calamine')
+            # Convert date columns
+            date_cols = ['availability_date', 'ROH delivery', 'SEC delivery', 'Asn Expected Date', 'Asn Creation Date']
+            for col in date_cols:
+                if col in df.columns:
+                    df[col] = pd.to_datetime(df[col], errors='coerce')
+            df = optimize_dtypes(df)
+
+            if cache_path:
+                try:
+                    write_parquet_cache(df, file_path, cache_path)
+                except Exception:
+                    # The cache is only an optimization - keep going with the parsed data
+                    pass
+
+        # The delay column holds days late, but may also contain the text 'late'
+        df['is_late'] = df['delay'].astype(str).str.strip().str.lower().eq('late').fillna(False).astype(bool)
+        # Whole-day delays are stored as int32; fractional ones keep their exact values
+        df['delay_days'] = downcast_exact(pd.to_numeric(df['delay'], errors='coerce').fillna(0))
         return df
     except Exception as e:
         st.error(f"Error loading file: {e}")
@@ -85,87 +229,138 @@ def calculate_actual_requirement(df, group_by_cols=['SEC order', 'item']):
     """
     if df.empty:
         return 0
-    return df.groupby(group_by_cols).apply(
+    return df.groupby(group_by_cols, sort=False, observed=True).apply(
         lambda x: x['allocated_qty'].sum() + x['balance'].max()
     ).sum()
 
 def get_latest_study_file():
     """Find the most recent Material Study file"""
     try:
-        files = glob.glob("MV_Material_Study-*.xlsx")
-        if not files:
-            # Also try without the pattern in case the file is named differently
-            files = glob.glob("*.xlsx")
-            files = [f for f in files if 'Material' in f or 'material' in f or 'Study' in f or 'study' in f]
-        if not files:
-            return None
-        return max(files, key=os.path.getctime)
+        # Single directory scan that only stats candidate files
+        latest = None
+        latest_ctime = None
+        # Also track other names in case the file is named differently
+        fallback = None
+        fallback_ctime = None
+        with os.scandir('.') as entries:
+            for entry in entries:
+                name = entry.name
+                if not name.endswith('.xlsx') or name.startswith('.') or not entry.is_file():
+                    continue
+                if name.startswith('MV_Material_Study-'):
+                    ctime = entry.stat().st_ctime
+                    if latest_ctime is None or ctime > latest_ctime:
+                        latest, latest_ctime = name, ctime
+                elif any(key in name for key in ('Material', 'material', 'Study', 'study')):
+                    ctime = entry.stat().st_ctime
+                    if fallback_ctime is None or ctime > fallback_ctime:
+                        fallback, fallback_ctime = name, ctime
+        return latest if latest is not None else fallback
     except Exception as e:
         return None
 
+@st.cache_data
+def project_status_table(df):
+    """
+    Calculate the status of every project in a single vectorized pass.
+
+    Rows are first collapsed to one row per demand (SEC order + item), using the
+    same allocated_qty.sum() + balance.max() rule as calculate_actual_requirement,
+    then aggregated per project.
+
+    Returns:
+        DataFrame indexed by SEC order, in order of first appearance
+    """
+    # Status categorization - per distinct item, not per row
+    item_status = df.groupby(['SEC order', 'item'], sort=False, observed=True).agg(
+        allocated_qty=('allocated_qty', 'sum'),
+        balance=('balance', 'max')  # Max balance gives the final unfulfilled amount
+    )
+    item_status = item_status.assign(
+        req_qty=item_status['allocated_qty'] + item_status['balance'],
+        is_ready=item_status['balance'].eq(0),
+        is_partial=item_status['balance'].gt(0) & item_status['allocated_qty'].gt(0),
+        is_missing=item_status['allocated_qty'].eq(0)
+    )
+
+    table = item_status.groupby(level='SEC order', sort=False, observed=True).agg(
+        total_items=('balance', 'size'),
+        total_req=('req_qty', 'sum'),
+        total_allocated=('allocated_qty', 'sum'),
+        total_balance=('balance', 'sum'),
+        ready_items=('is_ready', 'sum'),
+        partial_items=('is_partial', 'sum'),
+        missing_items=('is_missing', 'sum')
+    )
+
+    # Delivery dates and delay analysis
+    project_groups = df.groupby('SEC order', sort=False, observed=True)
+    table['sec_delivery'] = project_groups['SEC delivery'].min()
+    table['roh_delivery'] = project_groups['ROH delivery'].min()
+    delayed = df[(df['delay_days'] != 0) | df['is_late']]
+    delayed_groups = delayed.groupby('SEC order', sort=False, observed=True)
+    table['max_delay'] = delayed_groups['delay_days'].max().reindex(table.index, fill_value=0)
+    table['is_late'] = delayed_groups['is_late'].any().reindex(table.index, fill_value=False)
+
+    table['fulfillment_pct'] = np.where(
+        table['total_req'] > 0,
+        table['total_allocated'] / table['total_req'].where(table['total_req'] > 0) * 100,
+        0
+    )
+
+    # Overall status
+    is_ready = table['total_balance'] == 0
+    is_critical = (table['missing_items'] > 0) | table['is_late']
+    table['status'] = np.select([is_ready, is_critical], ["🟢 Ready", "🔴 Critical"], default="🟡 Partial")
+    table['status_class'] = np.select([is_ready, is_critical], ["status-ready", "status-critical"],
+                                      default="status-partial")
+
+    return table
+
+@st.cache_data(max_entries=256, show_spinner=False)
 def calculate_project_status(df, project):
     """Calculate comprehensive status for a project"""
-    proj_data = df[df['SEC order'] == project].copy()
-    
-    if proj_data.empty:
+    table = project_status_table(df)
+
+    if project not in table.index:
         return None
-    
-    # Count distinct items, not allocation rows
-    total_items = proj_data['item'].nunique()
-    # Calculate actual requirement correctly - each unique (SEC order, item) is one demand
-    total_req = calculate_actual_requirement(proj_data, group_by_cols=['SEC order', 'item'])
-    total_allocated = proj_data['allocated_qty'].sum()
-    # Calculate correct total balance - max balance per item (final unfulfilled amount)
-    total_balance = proj_data.groupby('item')['balance'].max().sum()
-    
-    # Status categorization - per distinct item, not per row
-    item_status = proj_data.groupby('item').agg({
-        'balance': 'max',  # Max balance gives the final unfulfilled amount
-        'allocated_qty': 'sum'  # Total allocated per item
-    }).reset_index()
-    
-    ready = len(item_status[item_status['balance'] == 0])
-    partial = len(item_status[(item_status['balance'] > 0) & (item_status['allocated_qty'] > 0)])
-    missing = len(item_status[item_status['allocated_qty'] == 0])
-    
-    # Delay analysis
-    delayed_items = proj_data[proj_data['delay'] != 0]
-    max_delay = delayed_items['delay'].max() if not delayed_items.empty else 0
-    
+
+    status_info = table.loc[project].to_dict()
+
     # Supply type breakdown
-    supply_breakdown = proj_data.groupby('supply_type')['allocated_qty'].sum().to_dict()
+    proj_data = df[df['SEC order'] == project]
+    status_info['supply_breakdown'] = proj_data.groupby('supply_type', sort=False, observed=True)['allocated_qty'].sum().to_dict()
+
+    return status_info
+
+# Empty row selection for values missing from rows_by_value()
+NO_ROWS = np.empty(0, dtype=np.intp)
+
+def rows_by_value(df, col):
+    """
+    Map each value of a column to the positions of its rows.
     
-    # Overall status
-    if total_balance == 0:
-        status = "🟢 Ready"
-        status_class = "status-ready"
-    elif missing > 0 or max_delay == 'late':
-        status = "🔴 Critical"
-        status_class = "status-critical"
-    else:
-        status = "🟡 Partial"
-        status_class = "status-partial"
+    Built in a single grouping pass, so several values can be selected with
+    df.iloc[...] instead of scanning the column once per value.
+    """
+    return df.groupby(col, sort=False, observed=True).indices
+
+def unique_sorted(df, col):
+    """
+    Sorted distinct values of a column, for select widgets.
     
-    return {
-        'status': status,
-        'status_class': status_class,
-        'total_items': total_items,
-        'ready_items': ready,
-        'partial_items': partial,
-        'missing_items': missing,
-        'total_req': total_req,
-        'total_allocated': total_allocated,
-        'total_balance': total_balance,
-        'fulfillment_pct': (total_allocated / total_req * 100) if total_req > 0 else 0,
-        'max_delay': max_delay,
-        'supply_breakdown': supply_breakdown,
-        'sec_delivery': proj_data['SEC delivery'].min(),
-        'roh_delivery': proj_data['ROH delivery'].min()
-    }
+    Categorical columns keep their distinct values as already sorted categories,
+    so only the integer codes in use need to be found.
+    """
+    values = df[col].dropna()
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.categories[np.unique(values.cat.codes)].tolist()
+    return sorted(values.unique())
 
+@st.cache_data(max_entries=256, show_spinner=False)
 def material_inquiry(df, item_code):
     """Get comprehensive information about a material"""
-    item_data = df[df['item'] == item_code].copy()
+    item_data = df[df['item'] == item_code]
     
     if item_data.empty:
         return None
@@ -174,13 +369,13 @@ def material_inquiry(df, item_code):
     total_req = calculate_actual_requirement(item_data, group_by_cols=['SEC order', 'item'])
     total_allocated = item_data['allocated_qty'].sum()
     # Calculate correct total balance - max balance per (project, item) gives final unfulfilled
-    total_balance = item_data.groupby(['SEC order', 'item'])['balance'].max().sum()
+    total_balance = item_data.groupby(['SEC order', 'item'], sort=False, observed=True)['balance'].max().sum()
     
     # Where is it allocated? - Calculate correctly per project
-    allocation_by_project = item_data.groupby('SEC order').agg({
+    allocation_by_project = item_data.groupby('SEC order', sort=False, observed=True).agg({
         'allocated_qty': 'sum',
         'balance': 'max'  # Max balance gives the final remaining amount
-    }).reset_index()
+    }).sort_index().reset_index()
     # Calculate actual req_qty for each project
     allocation_by_project['req_qty'] = (
         allocation_by_project['allocated_qty'] + allocation_by_project['balance']
@@ -189,29 +384,31 @@ def material_inquiry(df, item_code):
     allocation_by_project = allocation_by_project[['SEC order', 'req_qty', 'allocated_qty', 'balance']]
     
     # Supply sources
-    supply_sources = item_data.groupby(['supply_type', 'source']).agg({
+    supply_sources = item_data.groupby(['supply_type', 'source'], sort=False, observed=True).agg({
         'allocated_qty': 'sum'
-    }).reset_index()
+    }).sort_index().reset_index()
     
     # Blocking issues
     blocking_issues = []
+    supply_rows = rows_by_value(item_data, 'supply_type')
     
-    qc_items = item_data[item_data['supply_type'] == 'QC']
+    qc_items = item_data.iloc[supply_rows.get('QC', NO_ROWS)]
     if not qc_items.empty:
         blocking_issues.append(f"⚠️ {qc_items['allocated_qty'].sum():.0f} units stuck in QC")
     
-    gr_items = item_data[item_data['supply_type'] == 'GR_in_process']
+    gr_items = item_data.iloc[supply_rows.get('GR_in_process', NO_ROWS)]
     if not gr_items.empty:
         blocking_issues.append(f"⚠️ {gr_items['allocated_qty'].sum():.0f} units in GR process")
     
-    po_late = item_data[(item_data['supply_type'] == 'PO') & (item_data['delay'] == 'late')]
+    po_items = item_data.iloc[supply_rows.get('PO', NO_ROWS)]
+    po_late = po_items[po_items['is_late']]
     if not po_late.empty:
         blocking_issues.append(f"🔴 {po_late['allocated_qty'].sum():.0f} units on delayed POs")
     
-    pr_items = item_data[item_data['supply_type'] == 'PR']
+    pr_items = item_data.iloc[supply_rows.get('PR', NO_ROWS)]
     if not pr_items.empty:
         # Get max balance per project to avoid double-counting within same project
-        pr_balance = pr_items.groupby('SEC order')['balance'].max().sum()
+        pr_balance = pr_items.groupby('SEC order', sort=False, observed=True)['balance'].max().sum()
         blocking_issues.append(f"📝 {pr_balance:.0f} units need PR creation")
     
     return {
@@ -227,47 +424,230 @@ def material_inquiry(df, item_code):
 
 def supplier_performance(df):
     """Analyze supplier performance and delays"""
-    supplier_data = df[df['supplier'].notna()].copy()
+    has_supplier = df['supplier'].notna()
     
-    if supplier_data.empty:
+    if not has_supplier.any():
         return None
     
     # Calculate delays by supplier
-    delayed = supplier_data[supplier_data['delay'] != 0].copy()
-    
-    supplier_stats = delayed.groupby('supplier').agg({
-        'delay': ['count', 'mean', 'max'],
-        'allocated_qty': 'sum'
-    }).reset_index()
-    
-    supplier_stats.columns = ['supplier', 'delayed_items', 'avg_delay_days', 'max_delay_days', 'total_qty_delayed']
-    supplier_stats = supplier_stats.sort_values('avg_delay_days', ascending=False)
+    is_delayed = has_supplier & ((df['delay_days'] != 0) | df['is_late'])
+    
+    supplier_stats = (
+        df.loc[is_delayed, ['supplier', 'delay_days', 'allocated_qty']]
+        .groupby('supplier', sort=False, observed=True)
+        .agg(
+            delayed_items=('delay_days', 'size'),
+            avg_delay_days=('delay_days', 'mean'),
+            max_delay_days=('delay_days', 'max'),
+            total_qty_delayed=('allocated_qty', 'sum')
+        )
+        .reset_index()
+        .sort_values(['avg_delay_days', 'supplier'], ascending=[False, True])
+    )
     
     return supplier_stats
 
 def production_readiness(df):
     """Identify projects ready for production"""
-    projects = df['SEC order'].unique()
-    
-    readiness_list = []
-    
-    for project in projects:
-        status_info = calculate_project_status(df, project)
-        if status_info:
-            readiness_list.append({
-                'Project': project,
-                'Status': status_info['status'],
-                'Fulfillment %': status_info['fulfillment_pct'],
-                'Missing Items': status_info['missing_items'],
-                'Max Delay': status_info['max_delay'],
-                'SEC Delivery': status_info['sec_delivery']
-            })
-    
-    readiness_df = pd.DataFrame(readiness_list)
+    readiness_df = project_status_table(df).reset_index()[
+        ['SEC order', 'status', 'fulfillment_pct', 'missing_items', 'max_delay', 'sec_delivery']
+    ]
+    readiness_df.columns = ['Project', 'Status', 'Fulfillment %', 'Missing Items', 'Max Delay', 'SEC Delivery']
     readiness_df = readiness_df.sort_values('Fulfillment %', ascending=False)
     
     return readiness_df
 
+# Write every cell as its literal value: skips xlsxwriter's per-string formula and URL
+# checks, and keeps text such as "=..." from being exported as a live formula
+XLSX_WRITER_KWARGS = {'options': {'strings_to_formulas': False, 'strings_to_urls': False}}
+
+@st.cache_data(ttl="15m", max_entries=32, show_spinner=False)
+def to_xlsx_bytes(df):
+    """Build an Excel workbook containing a single table"""
+    buffer = BytesIO()
+    with pd.ExcelWriter(buffer, engine='xlsxwriter', engine_kwargs=XLSX_WRITER_KWARGS) as writer:
+        df.to_excel(writer, index=False)
+    return buffer.getvalue()
+
+@st.cache_data(ttl="15m", max_entries=8, show_spinner=False)
+def to_report_xlsx_bytes(sheets):
+    """Build an Excel workbook with one sheet per table, in the order given"""
+    buffer = BytesIO()
+    with pd.ExcelWriter(buffer, engine='xlsxwriter', engine_kwargs=XLSX_WRITER_KWARGS) as writer:
+        for sheet_name, sheet_df in sheets.items():
+            sheet_df.to_excel(writer, sheet_name=sheet_name, index=False)
+    return buffer.getvalue()
+
+@st.cache_data(ttl="15m", max_entries=8, show_spinner=False)
+def to_report_parquet_bytes(sheets):
+    """Build a single Parquet file holding every table, tagged with a 'sheet' column"""
+    tables = []
+    for sheet_name, sheet_df in sheets.items():
+        table = pa.Table.from_pandas(sheet_df, preserve_index=False)
+        tables.append(table.append_column('sheet', pa.array([sheet_name] * len(table), pa.string())))
+    
+    # Tables have different columns - missing ones are filled with nulls
+    buffer = BytesIO()
+    pq.write_table(pa.concat_tables(tables, promote_options='permissive'), buffer, compression='zstd')
+    return buffer.getvalue()
+
+@st.cache_data(ttl="15m", max_entries=8, show_spinner=False)
+def to_report_csv_zip_bytes(sheets):
+    """Build a ZIP archive with one CSV file per table"""
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for sheet_name, sheet_df in sheets.items():
+            archive.writestr(f"{sheet_name}.csv", sheet_df.to_csv(index=False))
+    return buffer.getvalue()
+
+@st.cache_data(ttl="15m", max_entries=64, show_spinner=False)
+def to_arrow_table(df):
+    """Convert a display table to Arrow once so reruns can pass it straight to st.dataframe"""
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+@st.cache_data(ttl="10m", max_entries=32, show_spinner=False)
+def compute_action_buckets(filter_key, _filtered_df, selected):
+    """
+    Split the selected projects' rows into the Push to Production action lists.
+    
+    The cache is keyed by filter_key instead of hashing the rows on every rerun.
+    
+    Args:
+        filter_key: Tuple identifying the data and the filter that produced _filtered_df
+        _filtered_df: Rows of the selected projects (not hashed)
+        selected: Tuple of the selected SEC orders / SEC numbers / products
+    
+    Returns:
+        Dict with the rows of each bucket ('qc', 'gr', 'wip', 'allocate', 'missing'),
+        limited to the displayed columns, their renamed display tables ('qc_display', ...)
+        and the distinct item count of each bucket ('counts')
+    """
+    filtered_df = _filtered_df
+    supply_type = filtered_df['supply_type']
+    source = filtered_df['source']
+    selected_idx = pd.Index(selected)
+    
+    # Label the supply-type buckets in a single pass; they are mutually exclusive.
+    # Reallocation: on-hand inventory that is not free stock and whose source job
+    # is NOT one of the selected requirements (SEC orders)
+    codes = np.select(
+        [
+            supply_type.eq('QC').to_numpy(),
+            supply_type.eq('GR_in_process').to_numpy(),
+            (supply_type.eq('inventory') & source.ne('free_stock') & ~source.isin(selected_idx)).to_numpy()
+        ],
+        [0, 1, 2],
+        default=-1
+    )
+    
+    # Row positions of every bucket. WIP is keyed on locater and missing on the
+    # quantities, so both can overlap the supply-type buckets.
+    bucket_rows = {
+        'qc': np.flatnonzero(codes == 0),
+        'gr': np.flatnonzero(codes == 1),
+        'allocate': np.flatnonzero(codes == 2),
+        'wip': np.flatnonzero(filtered_df['locater'].eq('1-1-1-1').to_numpy()),
+        'missing': np.flatnonzero(
+            (filtered_df['balance'].to_numpy() > 0) & (filtered_df['allocated_qty'].to_numpy() == 0)
+        )
+    }
+    
+    def take_rows(bucket_name, cols):
+        """Gather one bucket's rows of the listed columns in a single positional take"""
+        positions = filtered_df.columns.get_indexer_for(cols)
+        if (positions < 0).any():
+            missing = [col for col, pos in zip(cols, positions) if pos < 0]
+            raise KeyError(f"{missing} not in index")
+        return filtered_df.iloc[bucket_rows[bucket_name], positions]
+    
+    # Materials stopped at QC
+    qc_cols = {
+        'item': 'Item Code',
+        'description': 'Description',
+        'allocated_qty': 'Qty in QC',
+        'locater': 'PO-Line',
+        'supplier': 'Supplier',
+        'availability_date': 'Received Date'
+    }
+    qc_items = take_rows('qc', list(qc_cols))
+    qc_display = qc_items.rename(columns=qc_cols)
+    
+    # Materials pending GR (Goods Receipt)
+    gr_cols = {
+        'item': 'Item Code',
+        'description': 'Description',
+        'allocated_qty': 'Qty Pending GR',
+        'locater': 'PO-Line',
+        'supplier': 'Supplier',
+        'availability_date': 'Receipt Date'
+    }
+    gr_items = take_rows('gr', list(gr_cols))
+    gr_display = gr_items.rename(columns=gr_cols)
+    
+    # Materials in WIP (Work in Progress)
+    wip_cols = {
+        'item': 'Item Code',
+        'description': 'Description',
+        'allocated_qty': 'Available Qty',
+        'source': 'Source Job',
+        'locater': 'Locater'
+    }
+    wip_items = take_rows('wip', list(wip_cols))
+    wip_display = wip_items.rename(columns=wip_cols)
+    
+    # Materials to allocate from other jobs
+    # Rename columns for better readability, using only columns that exist in the dataframe
+    allocate_cols = {
+        'item': 'Item Code',
+        'description': 'Description',
+        'allocated_qty': 'Qty to Reallocate',
+        'SEC order': 'Project',
+        'source': 'Source Project',
+        'locater': 'Locater'
+    }
+    allocate_cols = {col: name for col, name in allocate_cols.items() if col in filtered_df.columns}
+    allocate_items = take_rows('allocate', list(allocate_cols))
+    allocate_display = allocate_items.rename(columns=allocate_cols)
+    
+    # Add a column showing if reallocation is easy or needs approval
+    if 'Source Project' in allocate_display.columns:
+        allocate_display['Action Required'] = np.where(
+            allocate_display['Source Project'].isin(['free_stock', '-']).to_numpy(),
+            '✅ Can Reallocate',
+            '⚠️ Needs Approval'
+        )
+    
+    # Missing materials (PRs required)
+    missing_cols = {
+        'item': 'Item Code',
+        'description': 'Description',
+        'req_qty': 'Required Qty',
+        'balance': 'Missing Qty'
+    }
+    missing_items = take_rows('missing', list(missing_cols))
+    missing_display = missing_items.rename(columns=missing_cols)
+    
+    # Distinct items per bucket, shared by the section banners, metrics and summary sheet
+    counts = {
+        name: items['item'].nunique()
+        for name, items in [('qc', qc_items), ('gr', gr_items), ('wip', wip_items),
+                            ('allocate', allocate_items), ('missing', missing_items)]
+    }
+    
+    return {
+        'qc': qc_items,
+        'qc_display': qc_display,
+        'gr': gr_items,
+        'gr_display': gr_display,
+        'wip': wip_items,
+        'wip_display': wip_display,
+        'allocate': allocate_items,
+        'allocate_display': allocate_display,
+        'missing': missing_items,
+        'missing_display': missing_display,
+        'counts': counts
+    }
+
 # Main App
 def main():
     st.markdown('<p class="main-header">📦 Material Planning Assistant</p>', unsafe_allow_html=True)
@@ -344,16 +724,20 @@ def main():
     elif page == "✅ Production Readiness":
         show_production_readiness(df)
     elif page == "🏭 Push to Production":
-        show_push_to_production(df)
+        show_push_to_production(df, get_data_token(uploaded_file))
 
 def show_dashboard_overview(df):
+    # Plotly is heavy to import - only load it on pages that draw charts
+    import plotly.express as px
+    import plotly.graph_objects as go
+    
     st.header("Dashboard Overview")
     
     col1, col2, col3, col4 = st.columns(4)
     
     total_projects = df['SEC order'].nunique()
     # Count distinct items (unique combinations of SEC order + item)
-    total_items = df.groupby(['SEC order', 'item']).ngroups
+    total_items = df.groupby(['SEC order', 'item'], sort=False, observed=True).ngroups
     # Calculate actual requirement correctly
     total_req = calculate_actual_requirement(df, group_by_cols=['SEC order', 'item'])
     total_allocated = df['allocated_qty'].sum()
@@ -363,7 +747,7 @@ def show_dashboard_overview(df):
     col2.metric("Total Distinct Items", total_items)
     col3.metric("Overall Fulfillment", f"{overall_fulfillment:.1f}%")
     # Calculate correct total balance - max balance per item (final unfulfilled amount)
-    total_balance = df.groupby(['SEC order', 'item'])['balance'].max().sum()
+    total_balance = df.groupby(['SEC order', 'item'], sort=False, observed=True)['balance'].max().sum()
     col4.metric("Total Balance", f"{total_balance:.0f} units")
     
     st.markdown("---")
@@ -373,25 +757,19 @@ def show_dashboard_overview(df):
     
     with col1:
         st.subheader("Supply Type Distribution")
-        supply_dist = df.groupby('supply_type')['allocated_qty'].sum().reset_index()
+        supply_dist = df.groupby('supply_type', sort=False, observed=True)['allocated_qty'].sum().sort_index().reset_index()
         fig = px.pie(supply_dist, values='allocated_qty', names='supply_type', 
                      title="Material Allocation by Source")
         st.plotly_chart(fig, use_container_width=True)
     
     with col2:
         st.subheader("Project Status Summary")
-        projects = df['SEC order'].unique()
-        status_counts = {'Ready': 0, 'Partial': 0, 'Critical': 0}
-        
-        for project in projects:
-            status_info = calculate_project_status(df, project)
-            if status_info:
-                if '🟢' in status_info['status']:
-                    status_counts['Ready'] += 1
-                elif '🟡' in status_info['status']:
-                    status_counts['Partial'] += 1
-                else:
-                    status_counts['Critical'] += 1
+        project_status = project_status_table(df)['status']
+        status_counts = {
+            'Ready': int((project_status == "🟢 Ready").sum()),
+            'Partial': int((project_status == "🟡 Partial").sum()),
+            'Critical': int((project_status == "🔴 Critical").sum())
+        }
         
         fig = go.Figure(data=[go.Bar(
             x=list(status_counts.keys()),
@@ -403,7 +781,7 @@ def show_dashboard_overview(df):
     
     # Recent delays
     st.subheader("⚠️ Items with Delays")
-    delayed = df[df['delay'] != 0].copy()
+    delayed = df[(df['delay_days'] != 0) | df['is_late']]
     if not delayed.empty:
         delayed_display = delayed[['SEC order', 'item', 'description', 'delay', 'supplier', 'availability_date']].head(10)
         st.dataframe(delayed_display, width="stretch")
@@ -413,7 +791,7 @@ def show_dashboard_overview(df):
 def show_project_health(df):
     st.header("📊 Project Health Monitor")
     
-    projects = sorted(df['SEC order'].unique())
+    projects = unique_sorted(df, 'SEC order')
     selected_project = st.selectbox("Select Project", projects)
     
     if selected_project:
@@ -452,33 +830,31 @@ def show_project_health(df):
             st.subheader("Material Details")
             proj_data = df[df['SEC order'] == selected_project]
             
-            # Add status column
-            def get_item_status(row):
-                if row['balance'] == 0:
-                    return "✅ Ready"
-                elif row['allocated_qty'] == 0:
-                    return "🔴 Missing"
-                else:
-                    return "🟡 Partial"
-            
-            proj_data_display = proj_data.copy()
-            proj_data_display['Status'] = proj_data_display.apply(get_item_status, axis=1)
-            
-            display_cols = ['Status', 'item', 'description', 'req_qty', 'allocated_qty', 'balance', 
+            display_cols = ['item', 'description', 'req_qty', 'allocated_qty', 'balance', 
                           'supply_type', 'source', 'availability_date', 'delay']
             
-            st.dataframe(proj_data_display[display_cols], width="stretch", height=400)
+            # Add status column - only the displayed columns are copied
+            proj_data_display = proj_data[display_cols].copy()
+            proj_data_display.insert(0, 'Status', np.select(
+                [proj_data['balance'].eq(0).to_numpy(), proj_data['allocated_qty'].eq(0).to_numpy()],
+                ["✅ Ready", "🔴 Missing"],
+                default="🟡 Partial"
+            ))
+            
+            st.dataframe(to_arrow_table(proj_data_display), width="stretch", height=400)
             
             # Blocking issues
             blocking = []
             if status_info['missing_items'] > 0:
                 blocking.append(f"🔴 {status_info['missing_items']} items completely missing")
             
-            qc_items = proj_data[proj_data['supply_type'] == 'QC']
+            supply_rows = rows_by_value(proj_data, 'supply_type')
+            
+            qc_items = proj_data.iloc[supply_rows.get('QC', NO_ROWS)]
             if not qc_items.empty:
                 blocking.append(f"⚠️ {len(qc_items)} items stuck in QC")
             
-            gr_items = proj_data[proj_data['supply_type'] == 'GR_in_process']
+            gr_items = proj_data.iloc[supply_rows.get('GR_in_process', NO_ROWS)]
             if not gr_items.empty:
                 blocking.append(f"⚠️ {len(gr_items)} items in GR process")
             
@@ -493,7 +869,7 @@ def show_material_inquiry(df):
     st.markdown("Search for any material to see its complete status across all projects")
     
     # Search box
-    all_items = sorted(df['item'].unique())
+    all_items = unique_sorted(df, 'item')
     selected_item = st.selectbox("Enter or select item code", all_items)
     
     if selected_item:
@@ -537,9 +913,11 @@ def show_material_inquiry(df):
             display_cols = ['SEC order', 'SEC Number', 'req_qty', 'allocated_qty', 'balance', 
                           'supply_type', 'source', 'locater', 'availability_date', 'delay', 'supplier']
             available_cols = [col for col in display_cols if col in info['item_data'].columns]
-            st.dataframe(info['item_data'][available_cols], width="stretch", height=400)
+            st.dataframe(to_arrow_table(info['item_data'][available_cols]), width="stretch", height=400)
 
 def show_supplier_performance(df):
+    import plotly.express as px
+    
     st.header("🚚 Supplier Performance Analysis")
     
     supplier_stats = supplier_performance(df)
@@ -571,11 +949,11 @@ def show_supplier_performance(df):
         selected_supplier = st.selectbox("Select Supplier", supplier_stats['supplier'].tolist())
         
         if selected_supplier:
-            supplier_items = df[(df['supplier'] == selected_supplier) & (df['delay'] != 0)]
+            supplier_items = df[(df['supplier'] == selected_supplier) & ((df['delay_days'] != 0) | df['is_late'])]
             display_cols = ['SEC order', 'item', 'description', 'allocated_qty', 'delay', 
                           'availability_date', 'ROH delivery', 'locater']
             available_cols = [col for col in display_cols if col in supplier_items.columns]
-            st.dataframe(supplier_items[available_cols], width="stretch", height=400)
+            st.dataframe(to_arrow_table(supplier_items[available_cols]), width="stretch", height=400)
     else:
         st.info("No supplier delay data available")
 
@@ -584,29 +962,22 @@ def show_critical_projects(df):
     
     st.markdown("Projects sorted by criticality (missing items, delays, and urgency)")
     
-    projects = df['SEC order'].unique()
-    critical_list = []
-    
-    for project in projects:
-        status_info = calculate_project_status(df, project)
-        if status_info and '🔴' in status_info['status']:
-            days_to_delivery = (status_info['sec_delivery'] - pd.Timestamp.now()).days if pd.notna(status_info['sec_delivery']) else 999
-            
-            critical_list.append({
-                'Project': project,
-                'Status': status_info['status'],
-                'Fulfillment %': status_info['fulfillment_pct'],
-                'Missing Items': status_info['missing_items'],
-                'Max Delay': status_info['max_delay'],
-                'Days to SEC Delivery': days_to_delivery,
-                'SEC Delivery': status_info['sec_delivery']
-            })
-    
-    if critical_list:
-        critical_df = pd.DataFrame(critical_list)
+    summary = project_status_table(df)
+    critical = summary[summary['status'] == "🔴 Critical"].reset_index()
+    
+    if not critical.empty:
+        critical_df = pd.DataFrame({
+            'Project': critical['SEC order'],
+            'Status': critical['status'],
+            'Fulfillment %': critical['fulfillment_pct'],
+            'Missing Items': critical['missing_items'],
+            'Max Delay': critical['max_delay'],
+            'Days to SEC Delivery': (critical['sec_delivery'] - pd.Timestamp.now()).dt.days.fillna(999).astype('int32'),
+            'SEC Delivery': critical['sec_delivery']
+        })
         critical_df = critical_df.sort_values(['Days to SEC Delivery', 'Missing Items'], ascending=[True, False])
         
-        st.dataframe(critical_df, width="stretch")
+        st.dataframe(to_arrow_table(critical_df), width="stretch")
         
         # Select project for details
         st.markdown("---")
@@ -617,13 +988,13 @@ def show_critical_projects(df):
             proj_data = df[df['SEC order'] == selected]
             
             # Show missing/delayed items
-            problem_items = proj_data[(proj_data['balance'] > 0) | (proj_data['delay'] != 0)]
+            problem_items = proj_data[(proj_data['balance'] > 0) | (proj_data['delay_days'] != 0) | proj_data['is_late']]
             
             st.markdown(f"### Problem Items for {selected}")
             display_cols = ['item', 'description', 'req_qty', 'allocated_qty', 'balance', 
                           'supply_type', 'delay', 'availability_date', 'supplier']
             available_cols = [col for col in display_cols if col in problem_items.columns]
-            st.dataframe(problem_items[available_cols], width="stretch", height=400)
+            st.dataframe(to_arrow_table(problem_items[available_cols]), width="stretch", height=400)
     else:
         st.success("🎉 No critical projects! Everything is on track.")
 
@@ -647,30 +1018,33 @@ def show_production_readiness(df):
         else:
             filtered_df = readiness_df[readiness_df['Fulfillment %'] >= min_fulfillment]
         
-        st.subheader(f"Projects Ready for Production: {len(filtered_df[filtered_df['Fulfillment %'] == 100])}")
+        is_ready = (filtered_df['Fulfillment %'] == 100).to_numpy()
+        ready_count = int(is_ready.sum())
         
-        # Color code the dataframe
-        def color_fulfillment(val):
-            if val == 100:
-                return 'background-color: #d4edda'
-            elif val >= 90:
-                return 'background-color: #fff3cd'
-            else:
-                return 'background-color: #f8d7da'
+        st.subheader(f"Projects Ready for Production: {ready_count}")
         
-        styled_df = filtered_df.style.applymap(color_fulfillment, subset=['Fulfillment %'])
-        st.dataframe(styled_df, width="stretch", height=500)
+        # Fulfillment is rendered natively by the grid instead of styling each cell
+        st.dataframe(
+            filtered_df,
+            width="stretch",
+            height=500,
+            column_config={
+                'Fulfillment %': st.column_config.ProgressColumn(
+                    'Fulfillment %', min_value=0, max_value=100, format="%.1f%%"
+                )
+            }
+        )
         
         # Quick actions
-        if len(filtered_df[filtered_df['Fulfillment %'] == 100]) > 0:
-            st.success(f"✅ {len(filtered_df[filtered_df['Fulfillment %'] == 100])} projects ready to start production!")
+        if ready_count > 0:
+            st.success(f"✅ {ready_count} projects ready to start production!")
             
-            ready_projects = filtered_df[filtered_df['Fulfillment %'] == 100]['Project'].tolist()
+            ready_projects = filtered_df.loc[is_ready, 'Project'].tolist()
             st.markdown("**Ready Projects:**")
             for proj in ready_projects:
                 st.markdown(f"- {proj}")
 
-def show_push_to_production(df):
+def show_push_to_production(df, data_token):
     st.header("🏭 Push to Production")
     
     st.markdown("""
@@ -688,17 +1062,17 @@ def show_push_to_production(df):
     
     with col2:
         if filter_type == "SEC Order":
-            options = sorted(df['SEC order'].unique())
+            options = unique_sorted(df, 'SEC order')
             selected = st.multiselect("Select SEC Order(s)", options, default=[options[0]] if options else [])
-            filtered_df = df[df['SEC order'].isin(selected)].copy() if selected else pd.DataFrame()
+            filtered_df = df[df['SEC order'].isin(pd.Index(selected))] if selected else pd.DataFrame()
         elif filter_type == "SEC Number":
-            options = sorted(df['SEC Number'].unique())
+            options = unique_sorted(df, 'SEC Number')
             selected = st.multiselect("Select SEC Number(s)", options, default=[options[0]] if options else [])
-            filtered_df = df[df['SEC Number'].isin(selected)].copy() if selected else pd.DataFrame()
+            filtered_df = df[df['SEC Number'].isin(pd.Index(selected))] if selected else pd.DataFrame()
         else:  # Product
-            options = sorted(df['product'].dropna().unique())
+            options = unique_sorted(df, 'product')
             selected = st.multiselect("Select Product(s)", options, default=[options[0]] if options else [])
-            filtered_df = df[df['product'].isin(selected)].copy() if selected else pd.DataFrame()
+            filtered_df = df[df['product'].isin(pd.Index(selected))] if selected else pd.DataFrame()
     
     with col3:
         # Count distinct items across selected projects
@@ -729,215 +1103,108 @@ def show_push_to_production(df):
         st.info("ℹ️ Please select at least one item from the filter above to view the production action plan.")
         return
     
-    st.markdown("---")
-    
-    # === 1. Materials Stopped at QC ===
-    st.subheader("⚠️ Materials Stopped at QC")
-    st.markdown("*These materials are delivered but awaiting quality approval*")
+    filter_key = (data_token, filter_type, tuple(selected))
+    buckets = compute_action_buckets(filter_key, filtered_df, tuple(selected))
+    qc_items, qc_display = buckets['qc'], buckets['qc_display']
+    gr_items, gr_display = buckets['gr'], buckets['gr_display']
+    wip_items, wip_display = buckets['wip'], buckets['wip_display']
+    allocate_items, allocate_display = buckets['allocate'], buckets['allocate_display']
+    missing_items, missing_display = buckets['missing'], buckets['missing_display']
+    counts = buckets['counts']
     
-    qc_items = filtered_df[filtered_df['supply_type'] == 'QC'].copy()
+    st.divider()
     
-    if not qc_items.empty:
-        distinct_qc = qc_items['item'].nunique()
-        st.error(f"🚫 **{distinct_qc} distinct items stuck in QC - Priority action required!**")
-        
-        qc_display = qc_items[['item', 'description', 'allocated_qty', 'locater', 'supplier', 'availability_date']].copy()
-        qc_display.columns = ['Item Code', 'Description', 'Qty in QC', 'PO-Line', 'Supplier', 'Received Date']
-        st.dataframe(qc_display, width="stretch", height=300)
-        
-        # Action button
-        buffer = BytesIO()
-        qc_display.to_excel(buffer, index=False, engine='openpyxl')
-        buffer.seek(0)
-        
-        st.download_button(
-            label="📋 Export QC Items to Excel",
-            data=buffer,
-            file_name=f"QC_Items_{file_suffix}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            key="export_qc"
-        )
-    else:
-        st.success("✅ No items stuck in QC")
+    # === 1. Materials Stopped at QC ===
+    render_bucket(
+        title="⚠️ Materials Stopped at QC",
+        subtitle="*These materials are delivered but awaiting quality approval*",
+        display=qc_display,
+        alert=f"🚫 **{counts['qc']} distinct items stuck in QC - Priority action required!**",
+        alert_style=st.error,
+        empty_message="✅ No items stuck in QC",
+        export_label="📋 Export QC Items to Excel",
+        file_name=f"QC_Items_{file_suffix}.xlsx",
+        key="export_qc"
+    )
     
-    st.markdown("---")
+    st.divider()
     
     # === 2. Materials Pending GR (Goods Receipt) ===
-    st.subheader("📦 Materials Pending GR (Goods Receipt)")
-    st.markdown("*These materials are received but not yet in system inventory*")
-    
-    gr_items = filtered_df[filtered_df['supply_type'] == 'GR_in_process'].copy()
-    
-    if not gr_items.empty:
-        distinct_gr = gr_items['item'].nunique()
-        st.warning(f"⏳ **{distinct_gr} distinct items pending GR processing**")
-        
-        gr_display = gr_items[['item', 'description', 'allocated_qty', 'locater', 'supplier', 'availability_date']].copy()
-        gr_display.columns = ['Item Code', 'Description', 'Qty Pending GR', 'PO-Line', 'Supplier', 'Receipt Date']
-        st.dataframe(gr_display, width="stretch", height=300)
-        
-        # Action button
-        buffer = BytesIO()
-        gr_display.to_excel(buffer, index=False, engine='openpyxl')
-        buffer.seek(0)
-        
-        st.download_button(
-            label="📋 Export GR Items to Excel",
-            data=buffer,
-            file_name=f"GR_Pending_{file_suffix}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            key="export_gr"
-        )
-    else:
-        st.success("✅ No items pending GR")
+    render_bucket(
+        title="📦 Materials Pending GR (Goods Receipt)",
+        subtitle="*These materials are received but not yet in system inventory*",
+        display=gr_display,
+        alert=f"⏳ **{counts['gr']} distinct items pending GR processing**",
+        alert_style=st.warning,
+        empty_message="✅ No items pending GR",
+        export_label="📋 Export GR Items to Excel",
+        file_name=f"GR_Pending_{file_suffix}.xlsx",
+        key="export_gr"
+    )
     
-    st.markdown("---")
+    st.divider()
     
     # === 3. Materials in WIP (Work in Progress) ===
-    st.subheader("🔧 Materials Available in WIP")
-    st.markdown("*Materials under locater 1-1-1-1 - available in production, ready to issue*")
-    
-    wip_items = filtered_df[filtered_df['locater'] == '1-1-1-1'].copy()
-    
-    if not wip_items.empty:
-        distinct_wip = wip_items['item'].nunique()
-        st.info(f"🔧 **{distinct_wip} distinct items available in WIP - Please issue from production**")
-        
-        wip_display = wip_items[['item', 'description', 'allocated_qty', 'source', 'locater']].copy()
-        wip_display.columns = ['Item Code', 'Description', 'Available Qty', 'Source Job', 'Locater']
-        st.dataframe(wip_display, width="stretch", height=300)
-        
-        # Action button
-        buffer = BytesIO()
-        wip_display.to_excel(buffer, index=False, engine='openpyxl')
-        buffer.seek(0)
-        
-        st.download_button(
-            label="📋 Export WIP Items to Excel",
-            data=buffer,
-            file_name=f"WIP_Materials_{file_suffix}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            key="export_wip"
-        )
-    else:
-        st.info("ℹ️ No items in WIP locater")
+    render_bucket(
+        title="🔧 Materials Available in WIP",
+        subtitle="*Materials under locater 1-1-1-1 - available in production, ready to issue*",
+        display=wip_display,
+        alert=f"🔧 **{counts['wip']} distinct items available in WIP - Please issue from production**",
+        alert_style=st.info,
+        empty_message="ℹ️ No items in WIP locater",
+        empty_style=st.info,
+        export_label="📋 Export WIP Items to Excel",
+        file_name=f"WIP_Materials_{file_suffix}.xlsx",
+        key="export_wip"
+    )
     
-    st.markdown("---")
+    st.divider()
     
     # === 4. Materials to Allocate (from Other Jobs) ===
-    st.subheader("🔄 Materials to Allocate from Other Jobs")
-    st.markdown("*On-hand inventory allocated to other projects - requires reallocation approval*")
-    
-    # Materials that are:
-    # - On-hand (inventory type)
-    # - Not free stock
-    # - Source job is NOT the same as the requirement (SEC order)
-    
-    allocate_items = filtered_df[
-        (filtered_df['supply_type'] == 'inventory') &
-        (filtered_df['source'] != 'free_stock') &
-        (~filtered_df['source'].isin(selected if selected else []))
-    ].copy()
-    
-    if not allocate_items.empty:
-        distinct_reallocate = allocate_items['item'].nunique()
-        st.warning(f"🔄 **{distinct_reallocate} distinct items need reallocation from other jobs**")
-        
-        # Use only columns that exist in the dataframe
-        base_cols = ['item', 'description', 'allocated_qty', 'SEC order', 'source', 'locater']
-        display_cols = [col for col in base_cols if col in allocate_items.columns]
-        
-        allocate_display = allocate_items[display_cols].copy()
-        
-        # Rename columns for better readability
-        col_rename = {
-            'item': 'Item Code',
-            'description': 'Description',
-            'allocated_qty': 'Qty to Reallocate',
-            'SEC order': 'Project',
-            'source': 'Source Project',
-            'locater': 'Locater'
-        }
-        allocate_display.columns = [col_rename.get(col, col) for col in allocate_display.columns]
-        
-        # Add a column showing if reallocation is easy or needs approval
-        if 'Source Project' in allocate_display.columns:
-            allocate_display['Action Required'] = allocate_display['Source Project'].apply(
-                lambda x: '⚠️ Needs Approval' if x not in ['free_stock', '-'] else '✅ Can Reallocate'
-            )
-        
-        st.dataframe(allocate_display, width="stretch", height=300)
-        
-        # Action button
-        buffer = BytesIO()
-        allocate_display.to_excel(buffer, index=False, engine='openpyxl')
-        buffer.seek(0)
-        
-        st.download_button(
-            label="📋 Export Reallocation List to Excel",
-            data=buffer,
-            file_name=f"Reallocation_Needed_{file_suffix}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            key="export_realloc"
-        )
-    else:
-        st.success("✅ No reallocation needed")
+    render_bucket(
+        title="🔄 Materials to Allocate from Other Jobs",
+        subtitle="*On-hand inventory allocated to other projects - requires reallocation approval*",
+        display=allocate_display,
+        alert=f"🔄 **{counts['allocate']} distinct items need reallocation from other jobs**",
+        alert_style=st.warning,
+        empty_message="✅ No reallocation needed",
+        export_label="📋 Export Reallocation List to Excel",
+        file_name=f"Reallocation_Needed_{file_suffix}.xlsx",
+        key="export_realloc"
+    )
     
-    st.markdown("---")
+    st.divider()
     
     # === 5. Missing Materials (PRs Required) ===
-    st.subheader("🚨 Missing Materials - PRs Required")
-    st.markdown("*Materials with no allocation - need immediate procurement*")
-    
-    missing_items = filtered_df[
-        (filtered_df['balance'] > 0) & 
-        (filtered_df['allocated_qty'] == 0)
-    ].copy()
-    
-    if not missing_items.empty:
-        distinct_missing = missing_items['item'].nunique()
-        st.error(f"🚨 **{distinct_missing} distinct items completely missing - Create PRs immediately!**")
-        
-        missing_display = missing_items[['item', 'description', 'req_qty', 'balance']].copy()
-        missing_display.columns = ['Item Code', 'Description', 'Required Qty', 'Missing Qty']
-        st.dataframe(missing_display, width="stretch", height=300)
-        
-        # Action button
-        buffer = BytesIO()
-        missing_display.to_excel(buffer, index=False, engine='openpyxl')
-        buffer.seek(0)
-        
-        st.download_button(
-            label="📋 Export Missing Items to Excel",
-            data=buffer,
-            file_name=f"Missing_Materials_{file_suffix}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            key="export_missing"
-        )
-    else:
-        st.success("✅ No missing materials")
+    render_bucket(
+        title="🚨 Missing Materials - PRs Required",
+        subtitle="*Materials with no allocation - need immediate procurement*",
+        display=missing_display,
+        alert=f"🚨 **{counts['missing']} distinct items completely missing - Create PRs immediately!**",
+        alert_style=st.error,
+        empty_message="✅ No missing materials",
+        export_label="📋 Export Missing Items to Excel",
+        file_name=f"Missing_Materials_{file_suffix}.xlsx",
+        key="export_missing"
+    )
     
-    st.markdown("---")
+    st.divider()
     
     # === Summary Action Panel ===
     st.subheader("📊 Action Summary")
     
     col1, col2, col3, col4, col5 = st.columns(5)
     
-    col1.metric("QC Items", qc_items['item'].nunique() if not qc_items.empty else 0)
-    col2.metric("GR Pending", gr_items['item'].nunique() if not gr_items.empty else 0)
-    col3.metric("WIP Items", wip_items['item'].nunique() if not wip_items.empty else 0)
-    col4.metric("To Reallocate", allocate_items['item'].nunique() if not allocate_items.empty else 0)
-    col5.metric("Missing", missing_items['item'].nunique() if not missing_items.empty else 0)
+    col1.metric("QC Items", counts['qc'])
+    col2.metric("GR Pending", counts['gr'])
+    col3.metric("WIP Items", counts['wip'])
+    col4.metric("To Reallocate", counts['allocate'])
+    col5.metric("Missing", counts['missing'])
     
     # Overall readiness assessment
-    total_blocking = (
-        (qc_items['item'].nunique() if not qc_items.empty else 0) +
-        (gr_items['item'].nunique() if not gr_items.empty else 0) +
-        (missing_items['item'].nunique() if not missing_items.empty else 0)
-    )
+    total_blocking = counts['qc'] + counts['gr'] + counts['missing']
     
-    st.markdown("---")
+    st.divider()
     
     if total_blocking == 0 and fulfillment >= 100:
         st.success("🎉 **ALL CLEAR! This project is ready to push to production!**")
@@ -947,41 +1214,90 @@ def show_push_to_production(df):
         st.error(f"🚫 **NOT READY**: {total_blocking} critical blockers need resolution")
     
     # Master export button
-    buffer = BytesIO()
-    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-        if not qc_items.empty:
-            qc_display.to_excel(writer, sheet_name="QC Items", index=False)
-        if not gr_items.empty:
-            gr_display.to_excel(writer, sheet_name="GR Pending", index=False)
-        if not wip_items.empty:
-            wip_display.to_excel(writer, sheet_name="WIP Materials", index=False)
-        if not allocate_items.empty:
-            allocate_display.to_excel(writer, sheet_name="Reallocation Needed", index=False)
-        if not missing_items.empty:
-            missing_display.to_excel(writer, sheet_name="Missing Materials", index=False)
-        
-        # Summary sheet
-        summary_data = {
-            'Category': ['QC Items', 'GR Pending', 'WIP Items', 'To Reallocate', 'Missing Materials'],
-            'Count': [
-                qc_items['item'].nunique() if not qc_items.empty else 0,
-                gr_items['item'].nunique() if not gr_items.empty else 0,
-                wip_items['item'].nunique() if not wip_items.empty else 0,
-                allocate_items['item'].nunique() if not allocate_items.empty else 0,
-                missing_items['item'].nunique() if not missing_items.empty else 0
-            ]
-        }
-        summary_df = pd.DataFrame(summary_data)
-        summary_df.to_excel(writer, sheet_name="Summary", index=False)
+    sheets = {}
+    if not qc_items.empty:
+        sheets["QC Items"] = qc_display
+    if not gr_items.empty:
+        sheets["GR Pending"] = gr_display
+    if not wip_items.empty:
+        sheets["WIP Materials"] = wip_display
+    if not allocate_items.empty:
+        sheets["Reallocation Needed"] = allocate_display
+    if not missing_items.empty:
+        sheets["Missing Materials"] = missing_display
+    
+    # Summary sheet
+    summary_data = {
+        'Category': ['QC Items', 'GR Pending', 'WIP Items', 'To Reallocate', 'Missing Materials'],
+        'Count': [counts['qc'], counts['gr'], counts['wip'], counts['allocate'], counts['missing']]
+    }
+    sheets["Summary"] = pd.DataFrame(summary_data)
+    
+    # Reports are built by deferred callables, only when their button is clicked
+    st.download_button(
+        label="📦 Export Complete Action Report (Parquet)",
+        data=lambda: to_report_parquet_bytes(sheets),
+        file_name=f"Production_Action_Report_{file_suffix}.parquet",
+        mime="application/octet-stream",
+        key="export_all_parquet",
+        on_click="ignore"
+    )
+    
+    with st.expander("📄 Excel / CSV versions of the report"):
+        st.download_button(
+            label="📦 Export Complete Action Report",
+            data=lambda: to_report_xlsx_bytes(sheets),
+            file_name=f"Production_Action_Report_{file_suffix}.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            key="export_all",
+            on_click="ignore"
+        )
+        st.download_button(
+            label="🗜️ Export Complete Action Report (CSV zip)",
+            data=lambda: to_report_csv_zip_bytes(sheets),
+            file_name=f"Production_Action_Report_{file_suffix}.zip",
+            mime="application/zip",
+            key="export_all_csv",
+            on_click="ignore"
+        )
+
+@st.fragment
+def render_bucket(*, title, subtitle, display, alert, alert_style, empty_message, export_label, file_name, key,
+                  empty_style=st.success):
+    """
+    Render one Push to Production action list with its Excel export.
+    
+    Runs as a fragment. The workbook is only built when the export button is
+    clicked, and the download does not trigger a rerun.
+    
+    Args:
+        title, subtitle: Section header and its italic description
+        display: Display table of the bucket
+        alert, alert_style: Banner shown above the table and the st function that shows it
+            (st.error, st.warning or st.info)
+        empty_message, empty_style: Banner shown instead when the bucket is empty
+        export_label, file_name, key: Download button label, file name and widget key
+    """
+    st.subheader(title)
+    st.markdown(subtitle)
+    
+    # Nothing to list - skip the table, the Arrow conversion and the workbook
+    if display.empty:
+        empty_style(empty_message)
+        return
+    
+    alert_style(alert)
     
-    buffer.seek(0)
+    st.dataframe(to_arrow_table(display), width="stretch", height=300)
     
+    # Action button - data is a callable, so the workbook is built on click
     st.download_button(
-        label="📦 Export Complete Action Report",
-        data=buffer,
-        file_name=f"Production_Action_Report_{file_suffix}.xlsx",
+        label=export_label,
+        data=lambda: to_xlsx_bytes(display),
+        file_name=file_name,
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        key="export_all"
+        key=key,
+        on_click="ignore"
     )
 
 if __name__ == "__main__":